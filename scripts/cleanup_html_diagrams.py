@@ -11,10 +11,78 @@ Fixes common issues in HTML exports from legacy Ai0Win tool:
 6. Preserves navigation structure while modernizing markup
 """
 
+import hashlib
+import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from urllib.parse import unquote
+from urllib.parse import unquote_to_bytes
+
+
+# Per-directory record of the files cleaned by the last run (see
+# process_directory)
+MANIFEST_NAME = '.cleanup_manifest.json'
+
+
+# Patterns are compiled once at import; process_file() runs every one of them
+# against every file, so keep pattern parsing out of the per-file path.
+# Files are processed as raw bytes: every pattern is ASCII, so there is no
+# need to decode the file and have the regex engine walk code points.
+
+# fix_html_links()
+# Quoted href="..." (group 1) or unquoted href=... ending at space, > or
+# newline (group 2), in either case, whose value holds a %XX escape
+_RE_HREF_ENCODED = re.compile(
+    rb'href=(?:"([^"]*%[0-9A-Fa-f]{2}[^"]*)"|([^"\s>]*%[0-9A-Fa-f]{2}[^"\s>]*))',
+    re.IGNORECASE
+)
+
+# fix_svg_embedding()
+# The whole <EMBED ...> tag; each lookahead captures the first SRC, WIDTH or
+# HEIGHT value inside the tag, in any order, and leaves its group unset if
+# the attribute is absent
+_RE_EMBED = re.compile(
+    rb'<EMBED'
+    rb'(?=(?:[^>]*?SRC="(?P<src>[^">]*)")?)'
+    rb'(?=(?:[^>]*?WIDTH="(?P<width>[^">]*)")?)'
+    rb'(?=(?:[^>]*?HEIGHT="(?P<height>[^">]*)")?)'
+    rb'[^>]*>',
+    re.IGNORECASE
+)
+
+# fix_html_structure()
+_RE_HREF_UNQUOTED = re.compile(rb'href=([^\s>"]+)')
+
+# Tag and attribute names emitted in upper case by Ai0Win; one alternation
+# lowercases all of them in a single scan. Any tag name is matched, but only
+# if it holds an uppercase letter and ends like a tag name (whitespace, / or
+# >), so already-lowercase markup never reaches the callback.
+_RE_CASE_FIX = re.compile(
+    rb'</?(?=[a-z0-9]*[A-Z])[A-Za-z][A-Za-z0-9]*(?=[\s/>])'
+    rb'|\b(?=[a-z]*[A-Z])(?i:HREF|NAME|SRC|TYPE|SCROLLING|WIDTH|HEIGHT|CLASS|ID)='
+)
+# The body of a <script> or <style> element (group 2) that has a closing tag.
+# It is code, not markup: i<N or "<Q>" there are not tags. Comments are
+# matched too (group 1 unset) so that a <script> inside one is not taken for
+# the start of a body.
+_RE_RAW_TEXT_BODY = re.compile(
+    rb'<!--.*?(?:-->|\Z)|<(script|style)\b[^>]*>(.*?)(?=</\1\s*>)',
+    re.IGNORECASE | re.DOTALL
+)
+# Any run of LANGUAGE="..." / TYPE="text/javascript" right after <script
+_RE_SCRIPT_LEGACY_ATTRS = re.compile(
+    rb'<script(?:\s+(?:LANGUAGE\s*=\s*"[^"]*"|TYPE\s*=\s*"text/javascript"))+',
+    re.IGNORECASE
+)
+_RE_ONLOAD = re.compile(rb'onload\s*=\s*(\w+)\(\)', re.IGNORECASE)
+
+# add_doctype_and_meta(); these replace strip()/lower() copies of the whole
+# file with case-insensitive or anchored searches
+_RE_DOCTYPE = re.compile(rb'\s*<!doctype', re.IGNORECASE)
+_RE_HTML_CLOSE_AT_END = re.compile(rb'</html>\s*\Z')
+_RE_META_CHARSET = re.compile(rb'<meta charset', re.IGNORECASE)
+_RE_HEAD_OPEN = re.compile(rb'(<head[^>]*>)', re.IGNORECASE)
 
 
 def fix_html_links(content):
@@ -23,27 +91,24 @@ def fix_html_links(content):
     
     Ai0Win encodes special characters: %5F=_, %28=(, %29=), %2F=/, etc.
     """
-    # Decode URL-encoded characters in quoted href values
-    def decode_quoted_href(match):
-        href = match.group(1)
-        decoded = unquote(href)
-        return f'href="{decoded}"'
-    
-    # Decode URL-encoded characters in unquoted href values
-    def decode_unquoted_href(match):
-        href = match.group(1)
-        decoded = unquote(href)
-        return f'href="{decoded}"'
+    # Every pattern below needs a %XX escape; most files have none
+    if b'%' not in content:
+        return content
     
-    # Match quoted href="..."
-    content = re.sub(r'href="([^"]*%[0-9A-Fa-f]{2}[^"]*)"', decode_quoted_href, content)
-    content = re.sub(r'HREF="([^"]*%[0-9A-Fa-f]{2}[^"]*)"', decode_quoted_href, content)
+    # Decode URL-encoded characters in quoted and unquoted href values alike.
+    # Diagram pages link to the same few files over and over, so each distinct
+    # value is decoded once per file.
+    decoded_hrefs = {}
     
-    # Match unquoted href=... (ends at space or > or newline)
-    content = re.sub(r'href=([^"\s>]*%[0-9A-Fa-f]{2}[^"\s>]*)', decode_unquoted_href, content)
-    content = re.sub(r'HREF=([^"\s>]*%[0-9A-Fa-f]{2}[^"\s>]*)', decode_unquoted_href, content)
+    def decode_href(match):
+        href = match.group(1) or match.group(2)
+        replacement = decoded_hrefs.get(href)
+        if replacement is None:
+            replacement = b'href="' + unquote_to_bytes(href) + b'"'
+            decoded_hrefs[href] = replacement
+        return replacement
     
-    return content
+    return _RE_HREF_ENCODED.sub(decode_href, content)
 
 
 def fix_svg_embedding(content):
@@ -55,20 +120,39 @@ def fix_svg_embedding(content):
     # Replace with: <object data="dgm1305.svg" type="image/svg+xml" ...></object>
     
     def convert_embed_to_object(match):
-        src_match = re.search(r'SRC="([^"]*)"', match.group(0), re.IGNORECASE)
-        width_match = re.search(r'WIDTH="([^"]*)"', match.group(0), re.IGNORECASE)
-        height_match = re.search(r'HEIGHT="([^"]*)"', match.group(0), re.IGNORECASE)
-        
-        src = src_match.group(1) if src_match else ""
-        width = width_match.group(1) if width_match else "100%"
-        height = height_match.group(1) if height_match else "600"
+        src = match['src'] if match['src'] is not None else b""
+        width = match['width'] if match['width'] is not None else b"100%"
+        height = match['height'] if match['height'] is not None else b"600"
         
-        return f'<object data="{src}" type="image/svg+xml" width="{width}" height="{height}"></object>'
+        return (b'<object data="' + src + b'" type="image/svg+xml" width="' + width
+                + b'" height="' + height + b'"></object>')
     
-    content = re.sub(r'<EMBED[^>]*>', convert_embed_to_object, content, flags=re.IGNORECASE)
+    content = _RE_EMBED.sub(convert_embed_to_object, content)
     return content
 
 
+def lowercase_names(content):
+    """
+    Lowercase tag and attribute names (see _RE_CASE_FIX), leaving the bodies
+    of <script> and <style> elements untouched.
+    """
+    def lower_match(match):
+        return match.group(0).lower()
+    
+    parts = []
+    pos = 0
+    for match in _RE_RAW_TEXT_BODY.finditer(content):
+        if match.group(1) is None:
+            continue  # a comment; it is case-fixed along with the markup
+        # Markup up to and including the opening tag, then the body verbatim
+        parts.append(_RE_CASE_FIX.sub(lower_match, content[pos:match.start(2)]))
+        parts.append(match.group(2))
+        pos = match.end(2)
+    parts.append(_RE_CASE_FIX.sub(lower_match, content[pos:]))
+    
+    return b''.join(parts)
+
+
 def fix_html_structure(content):
     """
     Modernize HTML to valid HTML5.
@@ -79,57 +163,30 @@ def fix_html_structure(content):
     """
     
     # First, quote unquoted href attributes
-    content = re.sub(r'href=([^\s>"]+)', r'href="\1"', content)
-    
-    # Convert uppercase tags to lowercase
-    content = re.sub(r'<HTML>', '<html>', content, flags=re.IGNORECASE)
-    content = re.sub(r'</HTML>', '</html>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<HEAD>', '<head>', content, flags=re.IGNORECASE)
-    content = re.sub(r'</HEAD>', '</head>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<BODY', '<body', content, flags=re.IGNORECASE)
-    content = re.sub(r'</BODY>', '</body>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<TITLE>', '<title>', content, flags=re.IGNORECASE)
-    content = re.sub(r'</TITLE>', '</title>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<SCRIPT', '<script', content, flags=re.IGNORECASE)
-    content = re.sub(r'</SCRIPT>', '</script>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<H2>', '<h2>', content, flags=re.IGNORECASE)
-    content = re.sub(r'</H2>', '</h2>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<P ', '<p ', content, flags=re.IGNORECASE)
-    content = re.sub(r'<P>', '<p>', content, flags=re.IGNORECASE)
-    content = re.sub(r'</P>', '</p>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<BR>', '<br>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<A ', '<a ', content, flags=re.IGNORECASE)
-    content = re.sub(r'</A>', '</a>', content, flags=re.IGNORECASE)
-    content = re.sub(r'<STYLE', '<style', content, flags=re.IGNORECASE)
-    content = re.sub(r'</STYLE>', '</style>', content, flags=re.IGNORECASE)
-    
-    # Fix HREF to href
-    content = re.sub(r'HREF=', 'href=', content, flags=re.IGNORECASE)
-    
-    # Remove LANGUAGE attribute from script tags (deprecated)
-    content = re.sub(r'<script\s+LANGUAGE\s*=\s*"[^"]*"', '<script', content, flags=re.IGNORECASE)
-    content = re.sub(r'<script\s+TYPE\s*=\s*"text/javascript"', '<script', content, flags=re.IGNORECASE)
+    content = _RE_HREF_UNQUOTED.sub(rb'href="\1"', content)
+    
+    # Convert uppercase tags and attribute names (HREF=, NAME=, ...) to lowercase
+    # (nothing to do if the file has no uppercase characters at all)
+    if not content.islower():
+        content = lowercase_names(content)
+    
+    # Remove LANGUAGE and default TYPE attributes from script tags (deprecated)
+    # Script tags are lowercase by now, so a plain substring test is exact
+    if b'<script' in content:
+        content = _RE_SCRIPT_LEGACY_ATTRS.sub(b'<script', content)
     
     # Fix onload attribute (should be lowercase)
-    content = re.sub(r'onload\s*=\s*(\w+)\(\)', r'onload="\1()"', content, flags=re.IGNORECASE)
-    
-    # Fix mixed case attributes
-    content = re.sub(r'NAME=', 'name=', content, flags=re.IGNORECASE)
-    content = re.sub(r'SRC=', 'src=', content, flags=re.IGNORECASE)
-    content = re.sub(r'TYPE=', 'type=', content, flags=re.IGNORECASE)
-    content = re.sub(r'SCROLLING=', 'scrolling=', content, flags=re.IGNORECASE)
-    content = re.sub(r'WIDTH=', 'width=', content, flags=re.IGNORECASE)
-    content = re.sub(r'HEIGHT=', 'height=', content, flags=re.IGNORECASE)
-    content = re.sub(r'CLASS=', 'class=', content, flags=re.IGNORECASE)
-    content = re.sub(r'ID=', 'id=', content, flags=re.IGNORECASE)
+    content = _RE_ONLOAD.sub(rb'onload="\1()"', content)
     
     return content
 
 
 def fix_file_extensions(content):
     """Fix references to .htm files (should be .html)."""
-    content = content.replace('.htm"', '.html"')
-    content = content.replace(".htm'", ".html'")
+    if b'.htm' not in content:
+        return content
+    content = content.replace(b'.htm"', b'.html"')
+    content = content.replace(b".htm'", b".html'")
     return content
 
 
@@ -137,52 +194,103 @@ def add_doctype_and_meta(content):
     """Add HTML5 doctype and meta tags if missing."""
     
     # Add doctype if missing
-    if not content.strip().lower().startswith('<!doctype'):
-        content = '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n<meta name="viewport" content="width=device-width, initial-scale=1.0">\n' + content
+    if not _RE_DOCTYPE.match(content):
+        content = b'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n<meta name="viewport" content="width=device-width, initial-scale=1.0">\n' + content
         # Need to close properly
-        if not content.strip().endswith('</html>'):
-            content += '\n</html>'
+        if not _RE_HTML_CLOSE_AT_END.search(content):
+            content += b'\n</html>'
     else:
         # Already has doctype, just ensure meta charset
-        if '<meta charset' not in content.lower():
+        if not _RE_META_CHARSET.search(content):
             # Add after <head>
-            content = re.sub(
-                r'(<head[^>]*>)',
-                r'\1\n<meta charset="UTF-8">',
-                content,
-                flags=re.IGNORECASE
-            )
+            content = _RE_HEAD_OPEN.sub(rb'\1\n<meta charset="UTF-8">', content)
     
     return content
 
 
+def normalize_newlines(content):
+    """
+    Convert CRLF and lone CR line endings to LF.
+    
+    Ai0Win runs on Windows and writes CRLF; the markup added by
+    add_doctype_and_meta() uses LF, so mixing them would leave files with
+    inconsistent line endings.
+    """
+    if b'\r' not in content:
+        return content
+    return content.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+
 def process_file(filepath):
-    """Process a single HTML file."""
+    """
+    Process a single HTML file.
     
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        # Try iso-8859-1 as fallback
-        with open(filepath, 'r', encoding='iso-8859-1') as f:
-            content = f.read()
+    Returns the SHA-256 hex digest of the cleaned content.
+    """
+    
+    # Read raw bytes; the fixes only touch ASCII markup, so whatever encoding
+    # the text is in passes through unchanged
+    original = filepath.read_bytes()
     
     # Apply fixes in order
+    content = normalize_newlines(original)
     content = fix_html_links(content)
     content = fix_svg_embedding(content)
     content = fix_html_structure(content)
     content = fix_file_extensions(content)
     content = add_doctype_and_meta(content)
     
-    # Write back
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
+    # Write back, unless nothing changed: leave the mtime alone so make, git
+    # and rsync do not see a no-op run as an edit
+    if content != original:
+        filepath.write_bytes(content)
+    
+    return hashlib.sha256(content).hexdigest()
+
+
+def rules_digest():
+    """
+    SHA-256 of this script's source, identifying the cleanup rules in force.
+    
+    Any edit to the fixes changes it, so files cleaned under older rules
+    are not skipped as already clean.
+    """
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def load_manifest(manifest_path):
+    """
+    Load the {filename: sha256} record of the last successful run.
     
-    return True
+    A missing or unreadable manifest, or one written under different cleanup
+    rules, just means every file gets processed.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('rules') != rules_digest():
+        return {}
+    files = manifest.get('files')
+    return files if isinstance(files, dict) else {}
+
+
+def save_manifest(manifest_path, manifest):
+    """Record the cleaned file hashes, and the rules used, for the next run."""
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'rules': rules_digest(), 'files': manifest}, f, indent=2, sort_keys=True)
+        f.write('\n')
 
 
 def process_directory(directory):
-    """Process all HTML files in a directory."""
+    """
+    Process all HTML files in a directory.
+    
+    Files whose content matches the hash recorded in the directory's
+    manifest were cleaned by a previous run under the same rules and are
+    skipped.
+    """
     
     html_dir = Path(directory)
     if not html_dir.exists():
@@ -197,25 +305,57 @@ def process_directory(directory):
     
     print(f"Found {len(html_files)} HTML files to process\n")
     
+    manifest_path = html_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    new_manifest = {}
+    
     success = 0
     failed = 0
+    skipped = 0
     
-    for html_file in html_files:
-        print(f"Processing: {html_file.name}")
-        
-        try:
-            if process_file(html_file):
-                print(f"  ✓ Fixed\n")
-                success += 1
+    # Files are independent, so fix them in parallel and report in order
+    with ProcessPoolExecutor() as executor:
+        futures = {}
+        for html_file in html_files:
+            try:
+                digest = hashlib.sha256(html_file.read_bytes()).hexdigest()
+            except OSError:
+                digest = None  # let process_file() report the error
+            
+            if digest is not None and manifest.get(html_file.name) == digest:
+                new_manifest[html_file.name] = digest
             else:
-                print(f"  ✗ Failed\n")
+                futures[html_file] = executor.submit(process_file, html_file)
+        
+        for html_file in html_files:
+            print(f"Processing: {html_file.name}")
+            
+            future = futures.get(html_file)
+            if future is None:
+                print(f"  - Unchanged since last run, skipped\n")
+                skipped += 1
+                continue
+            
+            try:
+                digest = future.result()
+                if digest:
+                    print(f"  ✓ Fixed\n")
+                    new_manifest[html_file.name] = digest
+                    success += 1
+                else:
+                    print(f"  ✗ Failed\n")
+                    failed += 1
+            except Exception as e:
+                print(f"  ✗ Error: {e}\n")
                 failed += 1
-        except Exception as e:
-            print(f"  ✗ Error: {e}\n")
-            failed += 1
+    
+    if new_manifest != manifest:
+        save_manifest(manifest_path, new_manifest)
     
     print(f"\n✓ HTML cleanup complete!")
     print(f"  Successfully processed: {success} files")
+    if skipped > 0:
+        print(f"  Skipped (unchanged): {skipped} files")
     if failed > 0:
         print(f"  Failed: {failed} files")
 
@@ -14,20 +14,43 @@ Fixes common issues in SVG exports from older programs:
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 
+# Patterns used by fix_svg(), compiled once at import.
+_RE_XML_DECL = re.compile(r'\s*<\?xml')
+_RE_SVG_OPEN = re.compile(r'<svg\s+')
+# A whole line holding either an opening <a xlink:href=...> (group 1 set) or
+# only a closing </a>
+_RE_ANCHOR_LINE = re.compile(
+    r'^[^\S\n]*(?:(<a[^\S\n]+xlink:href=)[^\n]*|</a>[^\S\n]*$)\n?',
+    re.MULTILINE
+)
+_RE_ANCHOR_XLINK_HREF = re.compile(r'<a\s+xlink:href="([^"]*)"([^>]*)>')
+_RE_ID_ATTR = re.compile(r'id="([^"]+)"')
+# Only where there is no line break yet, so running fix_svg() again on its own
+# output adds nothing. The lookbehind sits after the literal <g so the regex
+# engine can still scan ahead for it.
+_RE_BLOCK_CLOSE = re.compile(r'(</g>|</a>|</svg>)(?!\n)')
+_RE_GROUP_OPEN = re.compile(r'(<g(?<!\n<g)\s+id=)')
+_RE_INTER_TAG_SPACE = re.compile(r'>\s+<')
+_RE_TEXT_ANCHOR = re.compile(r'\s+text-anchor\s+=\s+"middle"')
+_RE_FONT_FAMILY = re.compile(r'\s+font-family="[^"]*"')
+_RE_FONT_SIZE = re.compile(r'\s+font-size="[^"]*"')
+_RE_FILL = re.compile(r'\s+fill\s+="[^"]*"')
+
+
 def fix_svg(content, filename):
     """Fix SVG content."""
     
     # 1. Add proper XML and SVG declarations if missing
-    if not content.strip().startswith('<?xml'):
+    if not _RE_XML_DECL.match(content):
         content = '<?xml version="1.0" encoding="UTF-8"?>\n' + content
     
     # 2. Ensure proper SVG namespace
     if 'xmlns=' not in content:
-        content = re.sub(
-            r'<svg\s+',
+        content = _RE_SVG_OPEN.sub(
             '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" ',
             content
         )
@@ -35,92 +58,66 @@ def fix_svg(content, filename):
     # 3. Fix nested anchor elements (a inside a) - remove inner ones, keep outer
     # Pattern: <a ...>...<a ...>...<polygon .../></a>...</a>
     # We need to extract the polygons and keep them but remove the inner <a> wrapper
-    lines = content.split('\n')
-    fixed_lines = []
     in_anchor = False
     skip_anchor_close = False
+    dropped_last_line = False
     
-    for line in lines:
-        # Check if this is an opening anchor tag
-        if re.match(r'\s*<a\s+xlink:href=', line):
+    def drop_inner_anchor(match):
+        nonlocal in_anchor, skip_anchor_close, dropped_last_line
+        # Opening anchor tag line
+        if match.group(1):
             if in_anchor:
                 # Skip this inner opening anchor tag
                 skip_anchor_close = True
-                continue
-            else:
-                in_anchor = True
-                fixed_lines.append(line)
-        # Check if this is a closing anchor tag
-        elif line.strip() == '</a>':
-            if skip_anchor_close:
-                skip_anchor_close = False
-                continue
-            else:
-                in_anchor = False
-                fixed_lines.append(line)
+                dropped_last_line = not match.group(0).endswith('\n')
+                return ''
+            in_anchor = True
+        # Closing anchor tag line
+        elif skip_anchor_close:
+            skip_anchor_close = False
+            dropped_last_line = not match.group(0).endswith('\n')
+            return ''
         else:
-            fixed_lines.append(line)
+            in_anchor = False
+        return match.group(0)
     
-    content = '\n'.join(fixed_lines)
+    content = _RE_ANCHOR_LINE.sub(drop_inner_anchor, content)
     
-    # 4. Convert xlink:href to href - for HTML/SVG compatibility and navigation
-    # xlink:href on <a> tags is not valid per SVG spec; use standard href instead
-    # This preserves the navigation links while maintaining XML/SVG validity
-    content = re.sub(
-        r'<a\s+xlink:href="([^"]*)"([^>]*)>',
-        r'<a href="\1"\2>',
-        content
-    )
+    # A dropped final line had no newline of its own; drop the one that
+    # separated it from the line before, as removing it from the list of
+    # lines would
+    if dropped_last_line and content.endswith('\n'):
+        content = content[:-1]
     
-    # 5. Fix duplicate IDs - make them unique by adding a counter suffix
+    # 4. Fix duplicate IDs - make them unique by adding a counter suffix
     id_counts = {}
+    
     def make_unique_id(match):
         old_id = match.group(1)
-        if old_id not in id_counts:
-            id_counts[old_id] = 0
-        else:
-            id_counts[old_id] += 1
-        
-        if id_counts[old_id] == 0:
+        count = id_counts.get(old_id, -1) + 1
+        id_counts[old_id] = count
+        if count == 0:
             return match.group(0)  # First occurrence keeps original
-        else:
-            new_id = f"{old_id}_{id_counts[old_id]}"
-            return match.group(0).replace(f'id="{old_id}"', f'id="{new_id}"')
-    
-    # Process line by line to track duplicates
-    lines = content.split('\n')
-    id_map = {}
-    fixed_lines = []
-    
-    for line in lines:
-        # Extract id attribute
-        id_match = re.search(r'id="([^"]+)"', line)
-        if id_match:
-            old_id = id_match.group(1)
-            if old_id not in id_map:
-                id_map[old_id] = 0
-                fixed_lines.append(line)
-            else:
-                id_map[old_id] += 1
-                new_id = f"{old_id}_{id_map[old_id]}"
-                new_line = line.replace(f'id="{old_id}"', f'id="{new_id}"')
-                fixed_lines.append(new_line)
-        else:
-            fixed_lines.append(line)
+        return f'id="{old_id}_{count}"'
+    
+    content = _RE_ID_ATTR.sub(make_unique_id, content)
     
-    content = '\n'.join(fixed_lines)
+    # 5. Convert xlink:href to href - for HTML/SVG compatibility and navigation
+    # xlink:href on <a> tags is not valid per SVG spec; use standard href instead
+    # This preserves the navigation links while maintaining XML/SVG validity
+    content = _RE_ANCHOR_XLINK_HREF.sub(r'<a href="\1"\2>', content)
     
     # 6. Format with proper line breaks for readability
     # Add newlines after main closing tags
-    content = re.sub(r'(</g>|</a>|</svg>)', r'\1\n', content)
-    content = re.sub(r'(<g\s+id=)', r'\n\1', content)
+    content = _RE_BLOCK_CLOSE.sub(r'\1\n', content)
+    content = _RE_GROUP_OPEN.sub(r'\n\1', content)
     
     # 7. Clean up extra whitespace inside tags
-    content = re.sub(r'>\s+<', '><', content)
-    content = re.sub(r'\s+text-anchor\s+=\s+"middle"', ' text-anchor="middle"', content)
-    content = re.sub(r'\s+font-family="[^"]*"', ' font-family="Arial, sans-serif"', content)
-    content = re.sub(r'\s+font-size="[^"]*"', ' font-size="11"', content)
-    content = re.sub(r'\s+fill\s+="[^"]*"', ' fill="rgb(0, 0, 0)"', content)
+    content = _RE_INTER_TAG_SPACE.sub('><', content)
+    content = _RE_TEXT_ANCHOR.sub(' text-anchor="middle"', content)
+    content = _RE_FONT_FAMILY.sub(' font-family="Arial, sans-serif"', content)
+    content = _RE_FONT_SIZE.sub(' font-size="11"', content)
+    content = _RE_FILL.sub(' fill="rgb(0, 0, 0)"', content)
     
     # 7. Remove trailing whitespace
     content = '\n'.join(line.rstrip() for line in content.split('\n'))
@@ -132,6 +129,36 @@ def fix_svg(content, filename):
     return content
 
 
+def normalize_newlines(content):
+    """Convert CRLF and lone CR line endings to LF, as text mode reads do."""
+    if '\r' not in content:
+        return content
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def process_file(svg_file):
+    """
+    Fix a single SVG file in place.
+    
+    Returns the line counts of the original and fixed content.
+    """
+    # Read original
+    original_data = svg_file.read_bytes()
+    original_content = normalize_newlines(original_data.decode('iso-8859-1'))
+    
+    # Fix
+    fixed_content = fix_svg(original_content, svg_file.name)
+    
+    # Write back, unless the file already holds exactly these bytes: leave the
+    # mtime alone so make, git and rsync do not see a no-op run as an edit
+    fixed_data = fixed_content.encode('utf-8')
+    if fixed_data != original_data:
+        svg_file.write_bytes(fixed_data)
+    
+    # Count lines without materialising a list of them
+    return original_content.count('\n') + 1, fixed_content.count('\n') + 1
+
+
 def process_directory(directory):
     """Process all SVG files in a directory."""
     svg_dir = Path(directory)
@@ -140,7 +167,7 @@ def process_directory(directory):
         print(f"Directory not found: {directory}")
         return
     
-    svg_files = list(svg_dir.glob('*.svg'))
+    svg_files = sorted(svg_dir.glob('*.svg'))
     
     if not svg_files:
         print(f"No SVG files found in {directory}")
@@ -148,32 +175,24 @@ def process_directory(directory):
     
     print(f"Found {len(svg_files)} SVG files to process\n")
     
-    for svg_file in sorted(svg_files):
-        print(f"Processing: {svg_file.name}")
+    # Files are independent, so fix them in parallel and report in order
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(process_file, svg_file) for svg_file in svg_files]
         
-        try:
-            # Read original
-            with open(svg_file, 'r', encoding='iso-8859-1') as f:
-                original_content = f.read()
-            
-            # Fix
-            fixed_content = fix_svg(original_content, svg_file.name)
-            
-            # Write back
-            with open(svg_file, 'w', encoding='utf-8') as f:
-                f.write(fixed_content)
-            
-            # Report changes
-            orig_lines = len(original_content.split('\n'))
-            fixed_lines = len(fixed_content.split('\n'))
-            
-            print(f"  ✓ Fixed")
-            if orig_lines != fixed_lines:
-                print(f"    Lines: {orig_lines} → {fixed_lines}")
-            print()
+        for svg_file, future in zip(svg_files, futures):
+            print(f"Processing: {svg_file.name}")
             
-        except Exception as e:
-            print(f"  ✗ Error: {e}\n")
+            try:
+                orig_lines, fixed_lines = future.result()
+                
+                # Report changes
+                print(f"  ✓ Fixed")
+                if orig_lines != fixed_lines:
+                    print(f"    Lines: {orig_lines} → {fixed_lines}")
+                print()
+                
+            except Exception as e:
+                print(f"  ✗ Error: {e}\n")
 
 
 if __name__ == '__main__':
@@ -18,6 +18,7 @@ Mapping:
 
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -54,24 +55,54 @@ DIAGRAM_MAPPING = {
 }
 
 
+# Human-readable SVG filename -> hex code filename, e.g.
+# 'Project Concerns.svg' -> 'dgm24.svg'
+_HEX_NAMES = {
+    info['human_name']: f"{hex_code}.svg"
+    for hex_code, info in DIAGRAM_MAPPING.items()
+}
+
+# Any xlink:href naming one of the human-readable files, matched in one pass
+_RE_HUMAN_HREF = re.compile(
+    r'xlink:href="(' + '|'.join(re.escape(name) for name in _HEX_NAMES) + r')"'
+)
+
+# (source filename, hex code filename, svg id) per diagram, in mapping order
+_DIAGRAM_FILES = [
+    (info['human_name'], f"{hex_code}.svg", info['id'])
+    for hex_code, info in DIAGRAM_MAPPING.items()
+]
+
+# The id attribute of the <svg> root element; requiring whitespace before id=
+# rules out grid="...", data-id="..." and xml:id="..."
+_RE_SVG_ID = re.compile(r'(<svg\b[^>]*?\sid=")[^"]*(")')
+
+
 def convert_href_to_hex(content):
     """Convert human-readable xlink:href values to hex code equivalents."""
+    return _RE_HUMAN_HREF.sub(
+        lambda m: f'xlink:href="{_HEX_NAMES[m.group(1)]}"',
+        content
+    )
+
+
+def regenerate_diagram(source_file, hex_file, svg_id):
+    """Write the hex code version of one cleaned SVG file."""
     
-    # Map human names to hex codes
-    replacements = {
-        'A0_ The SSK Extension.svg': 'dgm1305.svg',
-        'A1_ Value Decoder.svg': 'dgm1320.svg',
-        'A2_ Function Processor.svg': 'dgm1382.svg',
-        'A3_ Value Encoder.svg': 'dgm1450.svg',
-        'Project Concerns.svg': 'dgm24.svg',
-        'Implementation Concerns.svg': 'dgm824.svg',
-        'Decomposition of SSK Concerns.svg': 'dgm333.svg',
-    }
+    # Read cleaned version
+    with open(source_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Convert href references to hex codes
+    content = convert_href_to_hex(content)
     
-    for human_name, hex_code in replacements.items():
-        content = content.replace(f'xlink:href="{human_name}"', f'xlink:href="{hex_code}"')
+    # Ensure SVG id matches the hex code number
+    # Update the SVG root id if needed
+    content = _RE_SVG_ID.sub(rf'\g<1>{svg_id}\g<2>', content, count=1)
     
-    return content
+    # Write hex version
+    with open(hex_file, 'w', encoding='utf-8') as f:
+        f.write(content)
 
 
 def process_directory(diagram_dir):
@@ -84,44 +115,33 @@ def process_directory(diagram_dir):
     
     print("Regenerating diagrams with hex code naming and hot-links...\n")
     
-    for hex_code, info in DIAGRAM_MAPPING.items():
-        human_name = info['human_name']
-        source_file = diagram_path / human_name
-        hex_file = diagram_path / f"{hex_code}.svg"
-        
-        if not source_file.exists():
-            print(f"⚠ Missing source: {human_name}")
-            continue
-        
-        print(f"Processing: {human_name}")
-        print(f"  → {hex_code}.svg")
-        
-        try:
-            # Read cleaned version
-            with open(source_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Convert href references to hex codes
-            content = convert_href_to_hex(content)
+    # The diagrams are independent and the work is mostly file I/O, so
+    # overlap it with one thread per diagram; report in mapping order
+    with ThreadPoolExecutor(max_workers=len(_DIAGRAM_FILES)) as executor:
+        jobs = []
+        for human_name, hex_name, svg_id in _DIAGRAM_FILES:
+            source_file = diagram_path / human_name
             
-            # Ensure SVG id matches the hex code number
-            # Update the SVG root id if needed
-            svg_id = info['id']
-            content = re.sub(
-                r'<svg[^>]*id="[^"]*"',
-                lambda m: m.group(0).replace(f'id="{m.group(0).split("id=\"")[1].split("\"")[0]}"', f'id="{svg_id}"'),
-                content
-            )
-            
-            # Write hex version
-            with open(hex_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            future = None
+            if source_file.exists():
+                future = executor.submit(regenerate_diagram, source_file, diagram_path / hex_name, svg_id)
+            jobs.append((human_name, hex_name, future))
+        
+        for human_name, hex_name, future in jobs:
+            if future is None:
+                print(f"⚠ Missing source: {human_name}")
+                continue
             
-            print(f"  ✓ Created {hex_code}.svg")
-            print()
+            print(f"Processing: {human_name}")
+            print(f"  → {hex_name}")
             
-        except Exception as e:
-            print(f"  ✗ Error: {e}\n")
+            try:
+                future.result()
+                print(f"  ✓ Created {hex_name}")
+                print()
+                
+            except Exception as e:
+                print(f"  ✗ Error: {e}\n")
     
     print("✓ Hex diagram regeneration complete!")
     print("\nHot-link structure enabled:")
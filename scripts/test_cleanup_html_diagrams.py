@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for cleanup_html_diagrams.py
+
+Run from the repository root with:
+    python -m unittest discover scripts
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import cleanup_html_diagrams as cleanup
+
+
+class FixHtmlStructureTest(unittest.TestCase):
+
+    def test_lowercases_tags_and_attributes(self):
+        content = b'<HTML><BODY CLASS=main><IFRAME NAME="f" SRC="z.html"></IFRAME></BODY></HTML>'
+        self.assertEqual(
+            cleanup.fix_html_structure(content),
+            b'<html><body class=main><iframe name="f" src="z.html"></iframe></body></html>'
+        )
+
+    def test_leaves_script_and_style_bodies_alone(self):
+        script = b'for(i=0;i<N/2;i++){} if (x<MAX ) y(); var s="<Q>"; var ID=1;'
+        style = b'P { color: RED }'
+        content = (b'<SCRIPT LANGUAGE="JavaScript">' + script + b'</SCRIPT>'
+                   b'<STYLE TYPE="text/css">' + style + b'</STYLE><P>x</P>')
+        self.assertEqual(
+            cleanup.fix_html_structure(content),
+            b'<script>' + script + b'</script>'
+            b'<style type="text/css">' + style + b'</style><p>x</p>'
+        )
+
+    def test_script_without_closing_tag_does_not_hide_markup(self):
+        content = b'<SCRIPT SRC="a.js"><P>x</P><BODY>'
+        self.assertEqual(
+            cleanup.fix_html_structure(content),
+            b'<script src="a.js"><p>x</p><body>'
+        )
+
+    def test_script_inside_comment_does_not_hide_markup(self):
+        content = b'<!-- <SCRIPT> --><P>a</P><BODY><SCRIPT>if (a<B ) c();</SCRIPT>'
+        self.assertEqual(
+            cleanup.fix_html_structure(content),
+            b'<!-- <script> --><p>a</p><body><script>if (a<B ) c();</script>'
+        )
+
+
+class AddDoctypeAndMetaTest(unittest.TestCase):
+
+    def test_meta_charset_is_added_once(self):
+        # <head> well past the start of the file must not defeat the check
+        content = b'<!DOCTYPE html>\n<!-- ' + b'x' * 5000 + b' -->\n<html><head><title>t</title></head></html>'
+        for _ in range(3):
+            content = cleanup.add_doctype_and_meta(content)
+        self.assertEqual(content.lower().count(b'<meta charset'), 1)
+
+
+class ProcessFileTest(unittest.TestCase):
+
+    def test_windows_line_endings_become_lf(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = Path(tmp) / 'page.html'
+            page.write_bytes(b'<HTML>\r\n<BODY>\r\n<P>x</P>\r</BODY>\r\n</HTML>\r\n')
+            cleanup.process_file(page)
+            self.assertNotIn(b'\r', page.read_bytes())
+
+
+class ManifestTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / cleanup.MANIFEST_NAME
+            cleanup.save_manifest(path, {'a.html': 'abc'})
+            self.assertEqual(cleanup.load_manifest(path), {'a.html': 'abc'})
+
+    def test_entries_from_other_rules_are_discarded(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / cleanup.MANIFEST_NAME
+            path.write_text('{"rules": "older", "files": {"a.html": "abc"}}')
+            self.assertEqual(cleanup.load_manifest(path), {})
+            # Pre-versioning layout: a bare {filename: sha256} map
+            path.write_text('{"a.html": "abc"}')
+            self.assertEqual(cleanup.load_manifest(path), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
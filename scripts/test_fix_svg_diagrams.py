@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for fix_svg_diagrams.py
+
+Run from the repository root with:
+    python -m unittest discover scripts
+"""
+
+import unittest
+
+import fix_svg_diagrams as fix
+
+XML_DECL = '<?xml version="1.0" encoding="UTF-8"?>'
+
+
+class NestedAnchorTest(unittest.TestCase):
+
+    def test_inner_anchor_with_elements_before_it_is_removed(self):
+        content = ('<svg xmlns="x">\n'
+                   '<a xlink:href="outer.svg">\n'
+                   '  <rect/>\n'
+                   '  <a xlink:href="inner.svg">\n'
+                   '    <polygon/>\n'
+                   '  </a>\n'
+                   '</a>\n'
+                   '</svg>\n')
+        self.assertEqual(
+            fix.fix_svg(content, 'test.svg'),
+            XML_DECL + '<svg xmlns="x"><a href="outer.svg"><rect/><polygon/></a></svg>\n'
+        )
+
+    def test_dropped_last_line_without_newline(self):
+        # Removing the final </a> also removes the newline that preceded it
+        content = ('<svg xmlns="x">\n'
+                   '<a xlink:href="outer.svg">\n'
+                   '<a xlink:href="inner.svg">\n'
+                   '<text>label</text>\n'
+                   '\n'
+                   '</a>')
+        self.assertEqual(
+            fix.fix_svg(content, 'test.svg'),
+            XML_DECL + '<svg xmlns="x"><a href="outer.svg"><text>label</text>\n'
+        )
+
+    def test_dropped_last_line_with_newline(self):
+        content = ('<svg xmlns="x">\n'
+                   '<a xlink:href="outer.svg">\n'
+                   '<a xlink:href="inner.svg">\n'
+                   '<text>label</text>\n'
+                   '\n'
+                   '</a>\n')
+        self.assertEqual(
+            fix.fix_svg(content, 'test.svg'),
+            XML_DECL + '<svg xmlns="x"><a href="outer.svg"><text>label</text>\n\n'
+        )
+
+
+class DuplicateIdTest(unittest.TestCase):
+
+    def test_every_duplicate_on_a_line_gets_its_own_suffix(self):
+        content = ('<svg xmlns="x"><g id="a"/><g id="a"/><rect id="a"/>\n'
+                   '<rect id="b"/><rect id="b"/>\n'
+                   '</svg>')
+        self.assertEqual(
+            fix.fix_svg(content, 'test.svg'),
+            XML_DECL + '<svg xmlns="x"><g id="a"/><g id="a_1"/><rect id="a_2"/>'
+            '<rect id="b"/><rect id="b_1"/></svg>\n'
+        )
+
+
+class WhitespaceTest(unittest.TestCase):
+
+    def test_text_attributes_are_normalised(self):
+        content = ('<svg xmlns="x">\n'
+                   '  <text  text-anchor = "middle" font-family="Times New Roman"'
+                   '  font-size="12"  fill ="rgb(1, 0, 0)" >A0</text>   \n'
+                   '</svg>\n')
+        self.assertEqual(
+            fix.fix_svg(content, 'test.svg'),
+            XML_DECL + '<svg xmlns="x"><text text-anchor="middle" font-family="Arial, sans-serif"'
+            ' font-size="11" fill="rgb(0, 0, 0)" >A0</text></svg>\n'
+        )
+
+    def test_second_run_changes_nothing(self):
+        content = ('<svg width="1" id="24">\n'
+                   '  <g id="1" >\n'
+                   '  <a xlink:href="x.svg">\n'
+                   '  <a xlink:href="y.svg">\n'
+                   '     <polygon points="1,2" />\n'
+                   '  </a>\n'
+                   '  </a>\n'
+                   '  </g>\n'
+                   '  <g id="1"  stroke="x">text</g>\n'
+                   '</svg>\n')
+        once = fix.fix_svg(content, 'test.svg')
+        self.assertEqual(fix.fix_svg(once, 'test.svg'), once)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for regenerate_hex_diagrams.py
+
+Run from the repository root with:
+    python -m unittest discover scripts
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import regenerate_hex_diagrams as regenerate
+
+
+class RegenerateDiagramTest(unittest.TestCase):
+
+    def regenerate(self, content, svg_id='24'):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / 'Project Concerns.svg'
+            target = Path(tmp) / 'dgm24.svg'
+            source.write_text(content, encoding='utf-8')
+            regenerate.regenerate_diagram(source, target, svg_id)
+            return target.read_text(encoding='utf-8')
+
+    def test_root_id_is_replaced_not_lookalike_attributes(self):
+        content = '<svg grid="g" id="old" data-id="q" xml:id="z"><g id="1"/></svg>'
+        self.assertEqual(
+            self.regenerate(content),
+            '<svg grid="g" id="24" data-id="q" xml:id="z"><g id="1"/></svg>'
+        )
+
+    def test_hrefs_use_hex_code_names(self):
+        content = ('<svg id="1"><a xlink:href="Decomposition of SSK Concerns.svg"/>'
+                   '<a xlink:href="other.svg"/></svg>')
+        self.assertEqual(
+            self.regenerate(content),
+            '<svg id="24"><a xlink:href="dgm333.svg"/><a xlink:href="other.svg"/></svg>'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()